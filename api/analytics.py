@@ -0,0 +1,39 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
+import os
+from pymongo import MongoClient
+from backend.tracking import ROLLUP_ALL_TAG, get_rollup_series
+
+# Environment variables
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'studymeet_db')
+
+# MongoDB connection
+client = MongoClient(MONGO_URL)
+db = client[DB_NAME]
+
+app = FastAPI()
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.get("/rollups")
+async def get_rollups(tag: str = ROLLUP_ALL_TAG, interval: str = "hour", start: Optional[str] = None, end: Optional[str] = None):
+    """Get time-bucketed session creation, join and leave counts for a tag"""
+    try:
+        series = get_rollup_series(db, tag, interval, start, end)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    
+    return {"tag": tag, "interval": interval, "series": series}
+
+# Vercel serverless handler
+def handler(request):
+    return app(request)
\ No newline at end of file
@@ -6,6 +6,10 @@ from datetime import datetime, timezone
 import os
 from pymongo import MongoClient
 import uuid
+from backend.tracking import (
+    ROLLUP_ALL_TAG, bump_rollups, bump_user_tags, ensure_recommendation_indexes, ensure_rollup_indexes,
+    index_session_tags, prune_tag_index, remove_session_tags
+)
 
 # Environment variables
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -16,6 +20,10 @@ client = MongoClient(MONGO_URL)
 db = client[DB_NAME]
 sessions_collection = db.sessions
 
+# Idempotent, so safe to run on every cold start
+ensure_rollup_indexes(db)
+ensure_recommendation_indexes(db)
+
 # Pydantic models
 class CreateSessionRequest(BaseModel):
     title: str
@@ -54,6 +62,7 @@ async def get_sessions():
         {"date_time": {"$lt": current_time}, "date_time": {"$ne": None}},
         {"$set": {"is_expired": True}}
     )
+    prune_tag_index(db, current_time)
     
     sessions_cursor = sessions_collection.find({"is_expired": {"$ne": True}}).sort("created_at", -1)
     sessions = []
@@ -70,6 +79,9 @@ async def create_session(request: CreateSessionRequest):
     creator_username = "anonymous"
     creator_id = str(uuid.uuid4())
     
+    if ROLLUP_ALL_TAG in request.tags:
+        raise HTTPException(status_code=400, detail=f"Tag '{ROLLUP_ALL_TAG}' is reserved")
+    
     session_data = {
         "id": str(uuid.uuid4()),
         "title": request.title,
@@ -85,6 +97,8 @@ async def create_session(request: CreateSessionRequest):
     }
     
     sessions_collection.insert_one(session_data)
+    bump_rollups(db, session_data["tags"], "sessions_created")
+    index_session_tags(db, session_data)
     
     if '_id' in session_data:
         del session_data['_id']
@@ -126,6 +140,8 @@ async def join_session(session_id: str, username: str = "anonymous"):
             }
         }
     )
+    bump_rollups(db, session_doc.get("tags"), "joins")
+    bump_user_tags(db, username, session_doc.get("tags"))
     
     updated_session = sessions_collection.find_one({"id": session_id})
     return {"message": "Successfully joined session", "session": session_to_dict(updated_session)}
@@ -138,10 +154,13 @@ async def leave_session(session_id: str, username: str = "anonymous"):
     if not session_doc:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    sessions_collection.update_one(
+    result = sessions_collection.update_one(
         {"id": session_id},
         {"$pull": {"participant_usernames": username}}
     )
+    if result.modified_count:
+        bump_rollups(db, session_doc.get("tags"), "leaves")
+        bump_user_tags(db, username, session_doc.get("tags"), -1)
     
     updated_session = sessions_collection.find_one({"id": session_id})
     return {"message": "Successfully left session", "session": session_to_dict(updated_session)}
@@ -155,6 +174,7 @@ async def delete_session(session_id: str, creator_username: str = "anonymous"):
         raise HTTPException(status_code=404, detail="Session not found")
     
     sessions_collection.delete_one({"id": session_id})
+    remove_session_tags(db, session_id)
     return {"message": "Session deleted successfully"}
 
 # Vercel serverless handler
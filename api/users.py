@@ -0,0 +1,33 @@
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+import os
+from pymongo import MongoClient
+from backend.tracking import recommend_sessions
+
+# Environment variables
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'studymeet_db')
+
+# MongoDB connection
+client = MongoClient(MONGO_URL)
+db = client[DB_NAME]
+
+app = FastAPI()
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.get("/{username}/recommended")
+async def get_recommended_sessions(username: str, limit: int = 10):
+    """Get active sessions sharing tags with the sessions a user has joined"""
+    return {"recommended_sessions": recommend_sessions(db, username, limit)}
+
+# Vercel serverless handler
+def handler(request):
+    return app(request)
\ No newline at end of file
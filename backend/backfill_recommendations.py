@@ -0,0 +1,161 @@
+"""Rebuild the tag recommendation indexes from existing session documents.
+
+Usage: python backend/backfill_recommendations.py [--chunk-size 5000] [--ids-file PATH] [--force]
+
+Rebuilds `tag_sessions` (tag -> session inverted index) and `user_tag_counts`
+(how many joined sessions of each tag a user has). Only sessions that can still
+be recommended get index rows: ones dated in the future, or undated ones
+created within the recommendation window. Each is written to a staging
+collection that then replaces the live one in a single rename.
+
+The API keeps both collections up to date on every create, join, leave and
+delete, so this is only needed once, on a database that predates them. A
+rebuild reads sessions while the API may still be writing index rows and
+counts, and the rename then discards anything written in the meantime. It
+therefore refuses to run while either collection has data; pass --force only
+with API writes stopped.
+
+With --ids-file, the sessions whose ids are listed (one per line, as written by
+`ndjson_transfer.py import --ids-output`) are merged into the live collections
+instead: their tag rows are replaced and their participants' counts raised with
+`$inc`. This is safe while the API is running, but counts are not idempotent,
+so merge each ids file once.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+
+from typing import Optional
+
+import typer
+from pymongo import UpdateOne
+
+from server import db, sessions_collection
+from tracking import RECOMMENDATION_WINDOW, ensure_recommendation_indexes, read_id_chunks
+
+SESSION_PROJECTION = {"_id": 0, "id": 1, "tags": 1, "date_time": 1, "created_at": 1, "participant_usernames": 1}
+tag_sessions_collection = db.tag_sessions
+user_tag_counts_collection = db.user_tag_counts
+
+def count_user_tags(session_doc, user_tag_counts):
+    """Add a session's tags to the joined-tag counts of each of its participants"""
+    tags = set(session_doc.get("tags") or [])
+    for username in set(session_doc.get("participant_usernames") or []):
+        for tag in tags:
+            user_tag_counts[(username, tag)] += 1
+
+def tag_session_rows(session_doc, current_time):
+    """Inverted index rows for a session, or none if it can no longer be recommended"""
+    # Mongo hands back naive datetimes, which are UTC
+    date_time = session_doc.get("date_time")
+    created_at = session_doc.get("created_at")
+    if date_time is not None:
+        recommendable = date_time.replace(tzinfo=timezone.utc) >= current_time
+    elif created_at is not None:
+        recommendable = created_at.replace(tzinfo=timezone.utc) >= current_time - RECOMMENDATION_WINDOW
+    else:
+        recommendable = False
+    if not recommendable:
+        return []
+    return [
+        {"tag": tag, "session_id": session_doc["id"], "date_time": date_time, "created_at": created_at}
+        for tag in set(session_doc.get("tags") or [])
+    ]
+
+def replace_collection(collection, docs, indexes, chunk_size):
+    """Write docs to a staging collection and swap it in for the live one"""
+    staging_collection = db[f"{collection.name}_backfill"]
+    staging_collection.drop()
+    for keys, unique in indexes:
+        staging_collection.create_index(keys, unique=unique)
+
+    batch = []
+    written = 0
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= chunk_size:
+            staging_collection.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        staging_collection.insert_many(batch, ordered=False)
+        written += len(batch)
+
+    if written:
+        staging_collection.rename(collection.name, dropTarget=True)
+    else:
+        staging_collection.drop()
+        collection.delete_many({})
+    return written
+
+def merge_sessions(ids_file, chunk_size):
+    """Add the listed sessions to the live recommendation indexes"""
+    ensure_recommendation_indexes(db)
+    current_time = datetime.now(timezone.utc)
+    indexed = 0
+    counted = 0
+    for session_ids in read_id_chunks(ids_file, chunk_size):
+        user_tag_counts = Counter()
+        rows = []
+        for session_doc in sessions_collection.find({"id": {"$in": session_ids}}, SESSION_PROJECTION):
+            count_user_tags(session_doc, user_tag_counts)
+            rows.extend(tag_session_rows(session_doc, current_time))
+
+        # Replacing the rows keeps the inverted index free of duplicates on a rerun
+        tag_sessions_collection.delete_many({"session_id": {"$in": session_ids}})
+        if rows:
+            tag_sessions_collection.insert_many(rows, ordered=False)
+        if user_tag_counts:
+            user_tag_counts_collection.bulk_write([
+                UpdateOne({"username": username, "tag": tag}, {"$inc": {"count": count}}, upsert=True)
+                for (username, tag), count in user_tag_counts.items()
+            ], ordered=False)
+        indexed += len(rows)
+        counted += len(user_tag_counts)
+    return indexed, counted
+
+def main(chunk_size: int = 5000, ids_file: Optional[str] = None, force: bool = False):
+    """Rebuild the recommendation indexes in bulk from the sessions collection, or merge in listed sessions"""
+    if ids_file:
+        indexed, counted = merge_sessions(ids_file, chunk_size)
+        typer.echo(f"Indexed {indexed} tag/session pairs and raised {counted} user/tag counts from {ids_file}")
+        return
+
+    live_collections = [
+        collection.name for collection in (tag_sessions_collection, user_tag_counts_collection)
+        if collection.find_one({}, {"_id": 1})
+    ]
+    if live_collections and not force:
+        typer.echo(f"{', '.join(live_collections)} already maintained by the API; rebuilding would drop "
+                   f"writes made while it runs. Stop API writes and pass --force to rebuild anyway.", err=True)
+        raise typer.Exit(code=1)
+
+    user_tag_counts = Counter()
+    current_time = datetime.now(timezone.utc)
+
+    def tag_session_docs():
+        for session_doc in sessions_collection.find({}, SESSION_PROJECTION, batch_size=chunk_size):
+            count_user_tags(session_doc, user_tag_counts)
+            yield from tag_session_rows(session_doc, current_time)
+
+    indexed = replace_collection(
+        tag_sessions_collection,
+        tag_session_docs(),
+        [
+            ([("tag", 1), ("date_time", 1), ("created_at", 1)], False),
+            ([("date_time", 1), ("created_at", 1)], False),
+            ("session_id", False)
+        ],
+        chunk_size
+    )
+    typer.echo(f"Indexed {indexed} tag/session pairs")
+
+    counted = replace_collection(
+        user_tag_counts_collection,
+        ({"username": username, "tag": tag, "count": count} for (username, tag), count in user_tag_counts.items()),
+        [([("username", 1), ("tag", 1)], True)],
+        chunk_size
+    )
+    typer.echo(f"Counted {counted} user/tag pairs")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,115 @@
+"""Backfill the hourly session rollups from existing session documents.
+
+Usage: python backend/backfill_rollups.py [--chunk-size 50000] [--ids-file PATH] [--dry-run]
+
+Only sessions created before the earliest bucket already in `session_rollups`
+are counted, and their counts are merged in with `$inc`, so the live counters
+written by the API are never touched and historical and live data coexist.
+Re-running is a no-op: the backfilled buckets move the cutoff back to the
+oldest session. Sessions created during the earliest live hour but before the
+counters were deployed are not counted.
+
+With --ids-file, only the sessions whose ids are listed (one per line) are
+counted and merged, whatever their creation time. This is how sessions bulk
+loaded with `ndjson_transfer.py import --ids-output` are added to a live
+database. It is not idempotent: merge each ids file once.
+
+Join times are not stored on sessions, so backfilled joins are attributed to
+the hour the session was created, and backfilled leaves are 0.
+"""
+import pandas as pd
+from typing import Optional
+
+import typer
+from pymongo import UpdateOne
+
+from server import db, sessions_collection
+from tracking import ROLLUP_ALL_TAG, ROLLUP_FIELDS, read_id_chunks
+
+COUNT_FIELDS = list(ROLLUP_FIELDS)
+session_rollups_collection = db.session_rollups
+
+def list_length(value):
+    """Length of a list field, treating missing or malformed values as empty"""
+    return len(value) if isinstance(value, list) else 0
+
+def rollup_chunk(session_docs):
+    """Count sessions created and joins per (tag, hour) for a batch of sessions"""
+    frame = pd.DataFrame(session_docs, columns=["created_at", "tags", "participant_usernames"])
+    frame = frame.dropna(subset=["created_at"])
+    frame["bucket"] = pd.to_datetime(frame["created_at"], utc=True).dt.floor("h")
+    frame["sessions_created"] = 1
+    frame["joins"] = frame["participant_usernames"].map(list_length).astype("int64")
+    frame["leaves"] = 0
+
+    totals = frame.groupby("bucket", as_index=False)[COUNT_FIELDS].sum()
+    totals["tag"] = ROLLUP_ALL_TAG
+
+    # One row per (session, distinct tag) so a repeated tag is counted once
+    frame["tags"] = frame["tags"].map(lambda tags: tags if isinstance(tags, list) else [])
+    per_tag = frame.reset_index(names="row").explode("tags").rename(columns={"tags": "tag"})
+    per_tag = per_tag.dropna(subset=["tag"]).drop_duplicates(subset=["row", "tag"])
+    per_tag = per_tag[per_tag["tag"] != ROLLUP_ALL_TAG]
+    per_tag = per_tag.groupby(["tag", "bucket"], as_index=False)[COUNT_FIELDS].sum()
+
+    return pd.concat([totals, per_tag], ignore_index=True)
+
+def build_rollups(session_docs, chunk_size):
+    """Reduce an iterable of session documents to rollup rows, a chunk at a time"""
+    partials = []
+    chunk = []
+    for session_doc in session_docs:
+        chunk.append(session_doc)
+        if len(chunk) >= chunk_size:
+            partials.append(rollup_chunk(chunk))
+            chunk = []
+    if chunk:
+        partials.append(rollup_chunk(chunk))
+
+    if not partials:
+        return pd.DataFrame(columns=["tag", "bucket"] + COUNT_FIELDS)
+
+    # Partial counts from different chunks can share a (tag, bucket)
+    return pd.concat(partials, ignore_index=True).groupby(["tag", "bucket"], as_index=False)[COUNT_FIELDS].sum()
+
+def merge_rollups(rollups, chunk_size):
+    """Add rollup rows onto the live counters with upserted $inc writes"""
+    operations = [
+        UpdateOne(
+            {"tag": row.tag, "bucket": row.bucket.to_pydatetime()},
+            {"$inc": {field: int(getattr(row, field)) for field in COUNT_FIELDS}},
+            upsert=True
+        )
+        for row in rollups.itertuples(index=False)
+    ]
+    for offset in range(0, len(operations), chunk_size):
+        session_rollups_collection.bulk_write(operations[offset:offset + chunk_size], ordered=False)
+
+def main(chunk_size: int = 50000, ids_file: Optional[str] = None, dry_run: bool = False):
+    """Backfill session rollups for sessions older than the live counters, or for listed sessions"""
+    projection = {"_id": 0, "created_at": 1, "tags": 1, "participant_usernames": 1}
+    if ids_file:
+        session_docs = (
+            session_doc
+            for session_ids in read_id_chunks(ids_file, chunk_size)
+            for session_doc in sessions_collection.find({"id": {"$in": session_ids}}, projection)
+        )
+        scope = f"the sessions listed in {ids_file}"
+    else:
+        earliest_live = session_rollups_collection.find_one({}, {"_id": 0, "bucket": 1}, sort=[("bucket", 1)])
+        query = {"created_at": {"$lt": earliest_live["bucket"]}} if earliest_live else {}
+        session_docs = sessions_collection.find(query, projection, batch_size=chunk_size)
+        scope = f"sessions created before {earliest_live['bucket'].isoformat() if earliest_live else 'now'}"
+
+    rollups = build_rollups(session_docs, chunk_size)
+    typer.echo(f"Built {len(rollups)} rollup rows across {rollups['tag'].nunique()} tags for {scope}")
+
+    if dry_run:
+        typer.echo(rollups.sort_values(["tag", "bucket"]).to_string(index=False))
+        return
+
+    merge_rollups(rollups, chunk_size)
+    typer.echo(f"Merged into {session_rollups_collection.name}")
+
+if __name__ == "__main__":
+    typer.run(main)
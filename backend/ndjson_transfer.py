@@ -0,0 +1,161 @@
+"""Export and import sessions and users as NDJSON straight against MongoDB.
+
+Usage:
+    python backend/ndjson_transfer.py export sessions --output sessions.ndjson
+    python backend/ndjson_transfer.py import sessions --input sessions.ndjson --ids-output imported.txt
+    python backend/ndjson_transfer.py bench --count 1000000
+
+Exports include expired sessions and stream from a cursor, so memory stays flat
+regardless of collection size. Imports validate every line against the API's
+Session/User models and insert in `insert_many` batches. Unique indexes on
+session `id` and user `id`/`username` make re-imports idempotent: documents
+that already exist are counted as duplicates and skipped.
+
+Rollups and recommendation indexes are not touched. --ids-output writes the id
+of every newly inserted document, one per line, and passing that file to
+backfill_rollups.py and backfill_recommendations.py with --ids-file merges
+just those sessions into the live counters and indexes. Skipped duplicates are
+left out of the file, so each imported session is merged exactly once.
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import typer
+
+from server import (
+    DB_NAME, IMPORT_BATCH_SIZE, TRANSFER_COLLECTIONS, client, ensure_transfer_indexes, ndjson_chunks,
+    ndjson_to_document, write_import_batch
+)
+
+cli = typer.Typer(help="Stream sessions and users in and out of MongoDB as NDJSON")
+
+def get_collection(db_name, kind):
+    """Look up an exportable collection by name"""
+    if kind not in TRANSFER_COLLECTIONS:
+        raise typer.BadParameter(f"Must be one of: {', '.join(TRANSFER_COLLECTIONS)}")
+    return client[db_name][kind]
+
+def export_to(collection, output, batch_size):
+    """Write every document in a collection to a text stream"""
+    exported = 0
+    for chunk in ndjson_chunks(collection.find({}, {"_id": 0}, batch_size=batch_size), batch_size):
+        output.write(chunk)
+        exported += chunk.count("\n")
+    return exported
+
+def import_from(collection, source, model, batch_size, ids_output=None):
+    """Insert validated NDJSON lines from a text stream in fixed-size batches"""
+    ensure_transfer_indexes(collection.database)
+    imported = 0
+    duplicates = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, duplicates
+        inserted, skipped = write_import_batch(collection, batch)
+        imported += len(inserted)
+        duplicates += skipped
+        if ids_output is not None:
+            ids_output.writelines(f"{doc['id']}\n" for doc in inserted)
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(ndjson_to_document(line, model))
+        except ValueError as error:
+            typer.echo(f"Invalid {collection.name} on line {line_number} ({error}); "
+                       f"{imported} imported and {duplicates} duplicates skipped before it", err=True)
+            raise typer.Exit(code=1)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return imported, duplicates
+
+@cli.command("export")
+def export_command(kind: str, output: str = "-", batch_size: int = IMPORT_BATCH_SIZE, db_name: str = DB_NAME):
+    """Export all sessions or users, including expired ones, as NDJSON"""
+    collection = get_collection(db_name, kind)
+    if output == "-":
+        exported = export_to(collection, sys.stdout, batch_size)
+    else:
+        with open(output, "w", encoding="utf-8") as output_file:
+            exported = export_to(collection, output_file, batch_size)
+    typer.echo(f"Exported {exported} {kind}", err=True)
+
+@cli.command("import")
+def import_command(
+    kind: str,
+    input: str = "-",
+    ids_output: Optional[str] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    db_name: str = DB_NAME
+):
+    """Bulk load sessions or users from NDJSON"""
+    collection = get_collection(db_name, kind)
+    with ExitStack() as stack:
+        source = sys.stdin if input == "-" else stack.enter_context(open(input, encoding="utf-8"))
+        ids_file = stack.enter_context(open(ids_output, "w", encoding="utf-8")) if ids_output else None
+        imported, duplicates = import_from(collection, source, TRANSFER_COLLECTIONS[kind], batch_size, ids_file)
+    typer.echo(f"Imported {imported} {kind}, skipped {duplicates} duplicates", err=True)
+
+@cli.command("bench")
+def bench_command(count: int = 1000000, batch_size: int = IMPORT_BATCH_SIZE, db_name: str = f"{DB_NAME}_bench"):
+    """Time an export/import round trip of synthetic sessions in a scratch database"""
+    if db_name == DB_NAME:
+        raise typer.BadParameter("Refusing to benchmark against the live database")
+    collection = client[db_name].sessions
+    collection.drop()
+
+    now = datetime.now(timezone.utc)
+    tags = ["math", "physics", "chemistry", "biology", "history", "cs", "art", "music"]
+    for offset in range(0, count, batch_size):
+        collection.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "title": f"Session {index}",
+                "description": "Synthetic benchmark session",
+                "creator_username": "anonymous",
+                "creator_id": str(uuid.uuid4()),
+                "date_time": now + timedelta(hours=index % 500 - 250),
+                "tags": [tags[index % len(tags)], tags[index % 3]],
+                "participants": [],
+                "participant_usernames": [f"user_{index % 97}"],
+                "created_at": now - timedelta(minutes=index),
+                "is_expired": index % 4 == 0
+            }
+            for index in range(offset, min(offset + batch_size, count))
+        ], ordered=False)
+
+    with tempfile.NamedTemporaryFile("w+", suffix=".ndjson", encoding="utf-8") as dump_file:
+        started = time.perf_counter()
+        exported = export_to(collection, dump_file, batch_size)
+        export_seconds = time.perf_counter() - started
+        dump_file.flush()
+        dump_size = os.path.getsize(dump_file.name)
+
+        collection.drop()
+        dump_file.seek(0)
+        started = time.perf_counter()
+        imported, _ = import_from(collection, dump_file, TRANSFER_COLLECTIONS["sessions"], batch_size)
+        import_seconds = time.perf_counter() - started
+
+    client.drop_database(db_name)
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_memory_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    typer.echo(f"Exported {exported} sessions ({dump_size / 1e6:.1f} MB) in {export_seconds:.1f}s "
+               f"({exported / export_seconds:,.0f}/s)")
+    typer.echo(f"Imported {imported} sessions in {import_seconds:.1f}s ({imported / import_seconds:,.0f}/s)")
+    typer.echo(f"Peak memory: {peak_memory_mb:.0f} MB")
+
+if __name__ == "__main__":
+    cli()
@@ -1,13 +1,30 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from datetime import datetime, timezone
 import os
+import json
+import logging
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
 import uuid
 from bson import ObjectId
 
+# The same module is imported by the Vercel functions in api/
+try:
+    from backend.tracking import (
+        ROLLUP_ALL_TAG, bump_rollups, bump_user_tags, ensure_recommendation_indexes, ensure_rollup_indexes,
+        get_rollup_series, index_session_tags, prune_tag_index, recommend_sessions, remove_session_tags
+    )
+except ImportError:
+    from tracking import (
+        ROLLUP_ALL_TAG, bump_rollups, bump_user_tags, ensure_recommendation_indexes, ensure_rollup_indexes,
+        get_rollup_series, index_session_tags, prune_tag_index, recommend_sessions, remove_session_tags
+    )
+
 # Load environment variables
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 DB_NAME = os.environ.get('DB_NAME', 'test_database')
@@ -25,12 +42,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+logger = logging.getLogger(__name__)
+
 # MongoDB connection
 client = MongoClient(MONGO_URL)
 db = client[DB_NAME]
 users_collection = db.users
 sessions_collection = db.sessions
 
+@app.on_event("startup")
+async def ensure_indexes():
+    ensure_rollup_indexes(db)
+    try:
+        ensure_transfer_indexes(db)
+    except OperationFailure as error:
+        logger.warning("Could not create unique session/user indexes: %s", error)
+    ensure_recommendation_indexes(db)
+
 # Pydantic models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -50,6 +78,15 @@ class Session(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_expired: bool = False
 
+# Collections that can be exported/imported as NDJSON, with the model each
+# document is validated against on import
+TRANSFER_COLLECTIONS = {
+    "sessions": Session,
+    "users": User,
+}
+IMPORT_BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+
 class CreateSessionRequest(BaseModel):
     title: str
     description: str
@@ -83,6 +120,54 @@ def user_to_dict(user_doc):
         return doc_copy
     return None
 
+def document_to_ndjson(doc):
+    """Serialize a MongoDB document as one NDJSON line"""
+    return json.dumps(doc, default=lambda value: value.isoformat()) + "\n"
+
+def ndjson_chunks(cursor, chunk_size=IMPORT_BATCH_SIZE):
+    """Serialize a cursor as NDJSON, yielding chunk_size lines at a time"""
+    lines = []
+    for doc in cursor:
+        lines.append(document_to_ndjson(doc))
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+def ndjson_to_document(line, model):
+    """Validate one NDJSON line against a model and return it as a MongoDB document"""
+    try:
+        return model.model_validate_json(line).model_dump()
+    except ValidationError as error:
+        first_error = error.errors()[0]
+        location = ".".join(str(part) for part in first_error["loc"])
+        raise ValueError(f"{location}: {first_error['msg']}" if location else first_error["msg"])
+
+def ensure_transfer_indexes(database):
+    """Create the unique indexes that make NDJSON imports idempotent"""
+    database.sessions.create_index("id", unique=True)
+    database.users.create_index("id", unique=True)
+    database.users.create_index("username", unique=True)
+
+def write_import_batch(collection, batch):
+    """Insert a batch, returning the documents inserted and how many already existed"""
+    try:
+        collection.insert_many(batch, ordered=False)
+        return batch, 0
+    except BulkWriteError as error:
+        write_errors = error.details["writeErrors"]
+        if any(write_error["code"] != DUPLICATE_KEY_ERROR for write_error in write_errors):
+            raise
+        rejected = {write_error["index"] for write_error in write_errors}
+        return [doc for index, doc in enumerate(batch) if index not in rejected], len(write_errors)
+
+def get_transfer_collection(kind):
+    """Look up an exportable collection and its model by name"""
+    if kind not in TRANSFER_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    return db[kind], TRANSFER_COLLECTIONS[kind]
+
 # Routes
 @app.get("/api/health")
 async def health_check():
@@ -125,6 +210,7 @@ async def get_sessions():
         {"date_time": {"$lt": current_time}, "date_time": {"$ne": None}},
         {"$set": {"is_expired": True}}
     )
+    prune_tag_index(db, current_time)
     
     # Get active sessions
     sessions_cursor = sessions_collection.find({"is_expired": {"$ne": True}}).sort("created_at", -1)
@@ -143,6 +229,9 @@ async def create_session(request: CreateSessionRequest):
     creator_username = "anonymous"  # This should come from authentication
     creator_id = str(uuid.uuid4())
     
+    if ROLLUP_ALL_TAG in request.tags:
+        raise HTTPException(status_code=400, detail=f"Tag '{ROLLUP_ALL_TAG}' is reserved")
+    
     session_data = {
         "id": str(uuid.uuid4()),
         "title": request.title,
@@ -159,6 +248,8 @@ async def create_session(request: CreateSessionRequest):
     
     # Insert into database
     result = sessions_collection.insert_one(session_data)
+    bump_rollups(db, session_data["tags"], "sessions_created")
+    index_session_tags(db, session_data)
     
     # Remove the MongoDB _id from the response
     if '_id' in session_data:
@@ -188,6 +279,8 @@ async def join_session(session_id: str, username: str = "anonymous"):
             }
         }
     )
+    bump_rollups(db, session_doc.get("tags"), "joins")
+    bump_user_tags(db, username, session_doc.get("tags"))
     
     updated_session = sessions_collection.find_one({"id": session_id})
     return {"message": "Successfully joined session", "session": session_to_dict(updated_session)}
@@ -201,7 +294,7 @@ async def leave_session(session_id: str, username: str = "anonymous"):
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Remove user from participants
-    sessions_collection.update_one(
+    result = sessions_collection.update_one(
         {"id": session_id},
         {
             "$pull": {
@@ -209,6 +302,9 @@ async def leave_session(session_id: str, username: str = "anonymous"):
             }
         }
     )
+    if result.modified_count:
+        bump_rollups(db, session_doc.get("tags"), "leaves")
+        bump_user_tags(db, username, session_doc.get("tags"), -1)
     
     updated_session = sessions_collection.find_one({"id": session_id})
     return {"message": "Successfully left session", "session": session_to_dict(updated_session)}
@@ -224,6 +320,7 @@ async def delete_session(session_id: str, creator_username: str = "anonymous"):
     # In a real app, check if user is the creator
     # For now, allow anyone to delete
     sessions_collection.delete_one({"id": session_id})
+    remove_session_tags(db, session_id)
     
     return {"message": "Session deleted successfully"}
 
@@ -243,6 +340,92 @@ async def get_trending_sessions():
     
     return {"trending_sessions": sessions[:10]}  # Top 10 trending
 
+@app.get("/api/users/{username}/recommended")
+async def get_recommended_sessions(username: str, limit: int = 10):
+    """Get active sessions sharing tags with the sessions a user has joined"""
+    return {"recommended_sessions": recommend_sessions(db, username, limit)}
+
+@app.get("/api/analytics/rollups")
+async def get_rollups(tag: str = ROLLUP_ALL_TAG, interval: str = "hour", start: Optional[str] = None, end: Optional[str] = None):
+    """Get time-bucketed session creation, join and leave counts for a tag"""
+    try:
+        series = get_rollup_series(db, tag, interval, start, end)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    
+    return {"tag": tag, "interval": interval, "series": series}
+
+@app.get("/api/export/{kind}")
+def export_documents(kind: str):
+    """Stream every session or user, including expired ones, as NDJSON"""
+    collection, _ = get_transfer_collection(kind)
+    
+    # Documents go out in chunks as the cursor yields them, so memory use
+    # does not grow with the size of the collection
+    cursor = collection.find({}, {"_id": 0}, batch_size=IMPORT_BATCH_SIZE)
+    return StreamingResponse(ndjson_chunks(cursor), media_type="application/x-ndjson")
+
+@app.post("/api/import/{kind}")
+async def import_documents(kind: str, request: Request):
+    """Bulk load sessions or users from an NDJSON request body"""
+    collection, model = get_transfer_collection(kind)
+    try:
+        await run_in_threadpool(ensure_transfer_indexes, db)
+    except OperationFailure:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Existing {kind} have duplicate ids or usernames; resolve them before importing"
+        )
+    
+    imported_ids = []
+    duplicates = 0
+    line_number = 0
+    batch = []
+    
+    async def flush():
+        nonlocal duplicates, batch
+        if batch:
+            # Inserts run off the event loop so other requests keep being served
+            inserted, skipped = await run_in_threadpool(write_import_batch, collection, batch)
+            imported_ids.extend(doc["id"] for doc in inserted)
+            duplicates += skipped
+            batch = []
+    
+    def add_line(line):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        try:
+            batch.append(ndjson_to_document(line, model))
+        except ValueError as error:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid {kind} on line {line_number} ({error}); "
+                       f"{len(imported_ids)} imported and {duplicates} duplicates skipped before it"
+            )
+    
+    # Read the body incrementally and insert in fixed-size batches
+    pending = b""
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            add_line(line)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    add_line(pending)
+    await flush()
+    
+    # Rollups and recommendation indexes are not updated here; the ids can be
+    # passed to the backfill scripts with --ids-file to merge these in
+    return {
+        "message": f"Imported {len(imported_ids)} {kind}, skipped {duplicates} duplicates",
+        "imported": len(imported_ids),
+        "duplicates": duplicates,
+        "imported_ids": imported_ids
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""Incrementally maintained session statistics shared by every API entry point.
+
+Both backend/server.py and the Vercel functions in api/ call these helpers so
+that sessions created, joined, left or deleted through either one keep the
+rollup counters and the recommendation indexes up to date. Every helper takes
+the database to work on.
+"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo import InsertOne, UpdateOne
+
+# Rollup counters are kept per tag and also under this pseudo-tag for totals
+ROLLUP_ALL_TAG = "*"
+ROLLUP_FIELDS = ("sessions_created", "joins", "leaves")
+ROLLUP_INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Longest span a single series request may cover, whatever its interval
+ROLLUP_MAX_SPAN = timedelta(days=92)
+
+# Undated sessions never expire, so they are only recommended while recent
+RECOMMENDATION_WINDOW = timedelta(days=30)
+# Only a user's strongest tags are used to score candidates
+RECOMMENDATION_MAX_TAGS = 20
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp, treating naive values as UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def read_id_chunks(path, chunk_size):
+    """Yield lists of ids from a file with one id per line, as written by imports"""
+    with open(path, encoding="utf-8") as id_file:
+        chunk = []
+        for line in id_file:
+            if line.strip():
+                chunk.append(line.strip())
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def rollup_bucket(moment, interval="hour"):
+    """Truncate a timestamp to the start of its rollup bucket"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if interval == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+def ensure_rollup_indexes(database):
+    """Create the unique (tag, bucket) index the rollup upserts rely on"""
+    database.session_rollups.create_index([("tag", 1), ("bucket", 1)], unique=True)
+
+def bump_rollups(database, tags, field, amount=1):
+    """Increment the current hourly rollup counter for each tag and the total"""
+    bucket = rollup_bucket(datetime.now(timezone.utc))
+    operations = [
+        UpdateOne({"tag": tag, "bucket": bucket}, {"$inc": {field: amount}}, upsert=True)
+        for tag in {tag for tag in tags or [] if tag != ROLLUP_ALL_TAG} | {ROLLUP_ALL_TAG}
+    ]
+    database.session_rollups.bulk_write(operations, ordered=False)
+
+def get_rollup_series(database, tag=ROLLUP_ALL_TAG, interval="hour", start=None, end=None):
+    """Build a zero-filled series of rollup counts, raising ValueError on bad parameters"""
+    if interval not in ROLLUP_INTERVALS:
+        raise ValueError("Interval must be 'hour' or 'day'")
+
+    try:
+        end_time = parse_timestamp(end) if end else datetime.now(timezone.utc)
+        start_time = parse_timestamp(start) if start else end_time - timedelta(days=1)
+    except ValueError:
+        raise ValueError("Invalid start or end timestamp")
+
+    if start_time >= end_time:
+        raise ValueError("Start must be before end")
+
+    step = ROLLUP_INTERVALS[interval]
+    first_bucket = rollup_bucket(start_time, interval)
+    if end_time - first_bucket > ROLLUP_MAX_SPAN:
+        raise ValueError(f"Requested range is longer than {ROLLUP_MAX_SPAN.days} days")
+
+    # Hourly counters are read straight from the rollup collection and
+    # summed into coarser buckets here, so no session documents are scanned
+    counts = {}
+    rollups_cursor = database.session_rollups.find(
+        {"tag": tag, "bucket": {"$gte": first_bucket, "$lt": end_time}},
+        {"_id": 0, "bucket": 1, **{field: 1 for field in ROLLUP_FIELDS}}
+    )
+    for rollup_doc in rollups_cursor:
+        bucket_counts = counts.setdefault(rollup_bucket(rollup_doc["bucket"], interval), {})
+        for field in ROLLUP_FIELDS:
+            bucket_counts[field] = bucket_counts.get(field, 0) + rollup_doc.get(field, 0)
+
+    # Fill empty buckets with zeros so the series is contiguous
+    series = []
+    bucket = first_bucket
+    while bucket < end_time:
+        bucket_counts = counts.get(bucket, {})
+        series.append({"bucket": bucket.isoformat(), **{field: bucket_counts.get(field, 0) for field in ROLLUP_FIELDS}})
+        bucket += step
+
+    return series
+
+def ensure_recommendation_indexes(database):
+    """Create the indexes the tag index writes, pruning and scoring rely on"""
+    database.sessions.create_index("participant_usernames")
+    database.tag_sessions.create_index([("tag", 1), ("date_time", 1), ("created_at", 1)])
+    database.tag_sessions.create_index([("date_time", 1), ("created_at", 1)])
+    database.tag_sessions.create_index("session_id")
+    database.user_tag_counts.create_index([("username", 1), ("tag", 1)], unique=True)
+
+def index_session_tags(database, session_data):
+    """Add a session to the tag -> session inverted index"""
+    operations = [
+        InsertOne({
+            "tag": tag,
+            "session_id": session_data["id"],
+            "date_time": session_data.get("date_time"),
+            "created_at": session_data["created_at"]
+        })
+        for tag in set(session_data.get("tags") or [])
+    ]
+    if operations:
+        database.tag_sessions.bulk_write(operations, ordered=False)
+
+def remove_session_tags(database, session_id):
+    """Remove a deleted session from the tag -> session inverted index"""
+    database.tag_sessions.delete_many({"session_id": session_id})
+
+def bump_user_tags(database, username, tags, amount=1):
+    """Adjust how many joined sessions of each tag a user has"""
+    operations = [
+        UpdateOne({"username": username, "tag": tag}, {"$inc": {"count": amount}}, upsert=True)
+        for tag in set(tags or [])
+    ]
+    if operations:
+        database.user_tag_counts.bulk_write(operations, ordered=False)
+
+def recommendable_filter(current_time):
+    """Match tag index rows for sessions that can still be recommended"""
+    return {"$or": [
+        {"date_time": {"$gte": current_time}},
+        {"date_time": None, "created_at": {"$gte": current_time - RECOMMENDATION_WINDOW}}
+    ]}
+
+def prune_tag_index(database, current_time):
+    """Drop tag index rows for sessions that can no longer be recommended"""
+    # Two range deletes on the (date_time, created_at) index; scoring already
+    # ignores these rows, so this only keeps the index small
+    database.tag_sessions.delete_many({"date_time": {"$lt": current_time}})
+    database.tag_sessions.delete_many({"date_time": None, "created_at": {"$lt": current_time - RECOMMENDATION_WINDOW}})
+
+def recommend_sessions(database, username, limit=10):
+    """Score active sessions by overlap with the tags of sessions a user joined"""
+    limit = max(1, min(limit, 50))
+
+    # Weight each tag by how many of the user's joined sessions carry it
+    tag_weights = {
+        tag_doc["tag"]: tag_doc["count"]
+        for tag_doc in database.user_tag_counts.find(
+            {"username": username, "count": {"$gt": 0}}
+        ).sort("count", -1).limit(RECOMMENDATION_MAX_TAGS)
+    }
+    if not tag_weights:
+        return []
+
+    joined_ids = database.sessions.distinct("id", {"participant_usernames": username})
+
+    # Score candidates inside Mongo from the inverted index, so only the top
+    # few session ids come back and no session documents are scanned
+    current_time = datetime.now(timezone.utc)
+    tag_weight = {"$switch": {
+        "branches": [{"case": {"$eq": ["$tag", tag]}, "then": weight} for tag, weight in tag_weights.items()],
+        "default": 0
+    }}
+    ranked = list(database.tag_sessions.aggregate([
+        {"$match": {
+            "tag": {"$in": list(tag_weights)},
+            "session_id": {"$nin": joined_ids},
+            **recommendable_filter(current_time)
+        }},
+        {"$group": {"_id": "$session_id", "score": {"$sum": tag_weight}, "created_at": {"$max": "$created_at"}}},
+        {"$sort": {"score": -1, "created_at": -1}},
+        {"$limit": limit}
+    ]))
+    scores = {rank_doc["_id"]: rank_doc["score"] for rank_doc in ranked}
+
+    sessions = []
+    for session_doc in database.sessions.find({"id": {"$in": list(scores)}, "is_expired": {"$ne": True}}, {"_id": 0}):
+        session_doc["score"] = scores[session_doc["id"]]
+        sessions.append(session_doc)
+    sessions.sort(key=lambda session: (session["score"], session["created_at"]), reverse=True)
+
+    return sessions
@@ -1,7 +1,7 @@
 import requests
 import sys
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import uuid
 
 class StudyGroupAPITester:
@@ -12,7 +12,7 @@ class StudyGroupAPITester:
         self.test_user = f"test_user_{datetime.now().strftime('%H%M%S')}"
         self.created_session_id = None
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, params=None):
+    def run_test(self, name, method, endpoint, expected_status, data=None, params=None, body=None):
         """Run a single API test"""
         url = f"{self.base_url}/{endpoint}"
         headers = {'Content-Type': 'application/json'}
@@ -24,6 +24,8 @@ class StudyGroupAPITester:
         try:
             if method == 'GET':
                 response = requests.get(url, headers=headers, params=params)
+            elif method == 'POST' and body is not None:
+                response = requests.post(url, data=body, headers={'Content-Type': 'application/x-ndjson'}, params=params)
             elif method == 'POST':
                 response = requests.post(url, json=data, headers=headers, params=params)
             elif method == 'DELETE':
@@ -56,6 +58,16 @@ class StudyGroupAPITester:
             print(f"   Error: {str(e)}")
             return False, {}
 
+    def check(self, name, condition, detail):
+        """Apply an extra assertion to a test that already passed run_test"""
+        if condition:
+            print(f"   Check: {detail}")
+            return True
+        self.tests_passed -= 1
+        print(f"❌ FAILED - {name}")
+        print(f"   Check failed: {detail}")
+        return False
+
     def test_health_endpoint(self):
         """Test the health check endpoint"""
         return self.run_test(
@@ -144,6 +156,166 @@ class StudyGroupAPITester:
             200
         )
 
+    def test_recommended_sessions(self):
+        """Test that a new session sharing a joined session's tag is recommended"""
+        session_data = {
+            "title": f"Recommended Session {datetime.now().strftime('%H:%M:%S')}",
+            "description": "Shares a tag with the session joined above",
+            "date_time": (datetime.now(timezone.utc) + timedelta(days=1)).replace(microsecond=0).isoformat().replace('+00:00', 'Z'),
+            "tags": ["test"]
+        }
+        success, response = self.run_test(
+            "Create Session To Recommend",
+            "POST",
+            "api/sessions",
+            200,
+            data=session_data
+        )
+        if not success:
+            return success, response
+        recommended_id = response['session']['id']
+        
+        success, response = self.run_test(
+            "Get Recommended Sessions",
+            "GET",
+            f"api/users/{self.test_user}/recommended",
+            200
+        )
+        if not success:
+            return success, response
+        
+        match = next(
+            (session for session in response.get('recommended_sessions', []) if session['id'] == recommended_id),
+            None
+        )
+        return self.check(
+            "Get Recommended Sessions",
+            match is not None and match.get('score', 0) > 0,
+            f"session {recommended_id} recommended with score {match.get('score') if match else None}"
+        ), response
+
+    def test_analytics_rollups(self):
+        """Test that the create, join and leave above were counted in this hour's rollup"""
+        success, response = self.run_test(
+            "Get Analytics Rollups",
+            "GET",
+            "api/analytics/rollups",
+            200,
+            params={"tag": "test", "interval": "hour"}
+        )
+        if not success:
+            return success, response
+        
+        current_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        # Allow for the create/join having landed in the previous hour
+        recent = [
+            bucket for bucket in response.get('series', [])
+            if datetime.fromisoformat(bucket['bucket']) >= current_hour - timedelta(hours=1)
+        ]
+        created = sum(bucket['sessions_created'] for bucket in recent)
+        joins = sum(bucket['joins'] for bucket in recent)
+        leaves = sum(bucket['leaves'] for bucket in recent)
+        return self.check(
+            "Get Analytics Rollups",
+            created >= 1 and joins >= 1 and leaves >= 1,
+            f"sessions_created={created}, joins={joins}, leaves={leaves} for tag 'test' in the last hour"
+        ), response
+
+    def test_export_sessions(self):
+        """Test streaming sessions as NDJSON"""
+        url = f"{self.base_url}/api/export/sessions"
+        self.tests_run += 1
+        print(f"\n🔍 Testing Export Sessions...")
+        print(f"   URL: {url}")
+        
+        try:
+            response = requests.get(url, stream=True)
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+            success = response.status_code == 200 and any(
+                session.get('id') == self.created_session_id for session in lines
+            )
+            if success:
+                self.tests_passed += 1
+                print(f"✅ PASSED - Export Sessions ({len(lines)} sessions)")
+            else:
+                print(f"❌ FAILED - Export Sessions")
+                print(f"   Status Code: {response.status_code}, created session exported: False")
+            return success, {}
+        except Exception as e:
+            print(f"❌ FAILED - Export Sessions")
+            print(f"   Error: {str(e)}")
+            return False, {}
+
+    def test_import_round_trip(self):
+        """Test that re-importing an export is idempotent"""
+        export = requests.get(f"{self.base_url}/api/export/sessions")
+        exported_count = len([line for line in export.text.splitlines() if line.strip()])
+        
+        success, response = self.run_test(
+            "Import Sessions Round Trip",
+            "POST",
+            "api/import/sessions",
+            200,
+            body=export.content
+        )
+        if not success:
+            return success, response
+        
+        reexport = requests.get(f"{self.base_url}/api/export/sessions")
+        reexported_count = len([line for line in reexport.text.splitlines() if line.strip()])
+        return self.check(
+            "Import Sessions Round Trip",
+            response.get('imported') == 0 and response.get('duplicates') == exported_count
+            and reexported_count == exported_count,
+            f"imported={response.get('imported')}, duplicates={response.get('duplicates')}, "
+            f"sessions {exported_count} -> {reexported_count}"
+        ), response
+
+    def test_import_reports_new_ids(self):
+        """Test that an import lists only the sessions it inserted"""
+        export = requests.get(f"{self.base_url}/api/export/sessions")
+        existing_line = next(line for line in export.text.splitlines() if line.strip())
+        new_session = json.loads(existing_line)
+        new_session['id'] = str(uuid.uuid4())
+        
+        success, response = self.run_test(
+            "Import Reports New Ids",
+            "POST",
+            "api/import/sessions",
+            200,
+            body=f"{existing_line}\n{json.dumps(new_session)}\n".encode()
+        )
+        if not success:
+            return success, response
+        
+        return self.check(
+            "Import Reports New Ids",
+            response.get('imported') == 1 and response.get('duplicates') == 1
+            and response.get('imported_ids') == [new_session['id']],
+            f"imported={response.get('imported')}, duplicates={response.get('duplicates')}, "
+            f"imported_ids={response.get('imported_ids')}"
+        ), response
+
+    def test_import_malformed_line(self):
+        """Test that a line that is not JSON is rejected"""
+        return self.run_test(
+            "Import Malformed NDJSON",
+            "POST",
+            "api/import/sessions",
+            400,
+            body=b'{"title": "unterminated\n'
+        )
+
+    def test_import_invalid_document(self):
+        """Test that a JSON object that is not a valid session is rejected"""
+        return self.run_test(
+            "Import Invalid Session",
+            "POST",
+            "api/import/sessions",
+            400,
+            body=b'{"a": 1}\n{"created_at": 5}\n'
+        )
+
     def test_invalid_session_join(self):
         """Test joining a non-existent session"""
         fake_session_id = str(uuid.uuid4())
@@ -184,11 +356,18 @@ def main():
     
     # Session interaction tests
     test_results.append(tester.test_join_session())
+    test_results.append(tester.test_recommended_sessions())
     test_results.append(tester.test_leave_session())
+    test_results.append(tester.test_analytics_rollups())
+    test_results.append(tester.test_export_sessions())
+    test_results.append(tester.test_import_round_trip())
+    test_results.append(tester.test_import_reports_new_ids())
     
     # Error handling tests
     test_results.append(tester.test_invalid_session_join())
     test_results.append(tester.test_invalid_session_leave())
+    test_results.append(tester.test_import_malformed_line())
+    test_results.append(tester.test_import_invalid_document())
     
     # Print final results
     print("\n" + "=" * 60)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules, the way they
+# are run from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
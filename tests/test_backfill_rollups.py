@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pandas as pd
+
+from backfill_rollups import build_rollups, rollup_chunk
+from tracking import ROLLUP_ALL_TAG
+
+TEN_AM = datetime(2026, 1, 1, 10, 5)
+ELEVEN_AM = datetime(2026, 1, 1, 11, 5)
+
+def counts(rollups, tag, hour):
+    """Return the (sessions_created, joins, leaves) row for a tag and hour"""
+    bucket = pd.Timestamp(datetime(2026, 1, 1, hour), tz="UTC")
+    rows = rollups[(rollups["tag"] == tag) & (rollups["bucket"] == bucket)]
+    assert len(rows) == 1, f"expected one row for {tag} at {hour}:00, got {len(rows)}"
+    row = rows.iloc[0]
+    return int(row["sessions_created"]), int(row["joins"]), int(row["leaves"])
+
+def test_repeated_tag_counted_once_per_session():
+    rollups = rollup_chunk([
+        {"created_at": TEN_AM, "tags": ["math", "math", "cs"], "participant_usernames": ["a", "b"]},
+    ])
+
+    assert counts(rollups, "math", 10) == (1, 2, 0)
+    assert counts(rollups, "cs", 10) == (1, 2, 0)
+    assert counts(rollups, ROLLUP_ALL_TAG, 10) == (1, 2, 0)
+
+def test_missing_and_malformed_lists_count_as_empty():
+    rollups = rollup_chunk([
+        {"created_at": TEN_AM},
+        {"created_at": TEN_AM, "tags": None, "participant_usernames": None},
+        {"created_at": TEN_AM, "tags": "math", "participant_usernames": "a"},
+    ])
+
+    assert counts(rollups, ROLLUP_ALL_TAG, 10) == (3, 0, 0)
+    assert set(rollups["tag"]) == {ROLLUP_ALL_TAG}
+
+def test_chunk_without_participants_field():
+    rollups = rollup_chunk([{"created_at": TEN_AM, "tags": ["math"]}])
+
+    assert counts(rollups, "math", 10) == (1, 0, 0)
+
+def test_reserved_tag_is_not_counted_as_a_tag():
+    rollups = rollup_chunk([
+        {"created_at": TEN_AM, "tags": [ROLLUP_ALL_TAG, "math"], "participant_usernames": ["a"]},
+    ])
+
+    # The session is still counted once in the totals, not twice
+    assert counts(rollups, ROLLUP_ALL_TAG, 10) == (1, 1, 0)
+    assert counts(rollups, "math", 10) == (1, 1, 0)
+
+def test_sessions_without_created_at_are_skipped():
+    rollups = rollup_chunk([
+        {"created_at": None, "tags": ["math"]},
+        {"created_at": TEN_AM, "tags": ["math"]},
+    ])
+
+    assert counts(rollups, "math", 10) == (1, 0, 0)
+
+def test_same_bucket_is_merged_across_chunks():
+    session_docs = [
+        {"created_at": TEN_AM, "tags": ["math"], "participant_usernames": ["a"]},
+        {"created_at": TEN_AM, "tags": ["math"], "participant_usernames": ["b", "c"]},
+        {"created_at": ELEVEN_AM, "tags": ["math"], "participant_usernames": []},
+    ]
+
+    rollups = build_rollups(iter(session_docs), chunk_size=1)
+
+    assert counts(rollups, "math", 10) == (2, 3, 0)
+    assert counts(rollups, "math", 11) == (1, 0, 0)
+    assert counts(rollups, ROLLUP_ALL_TAG, 10) == (2, 3, 0)
+    assert len(rollups) == 4
+
+def test_no_sessions_builds_no_rows():
+    rollups = build_rollups(iter([]), chunk_size=10)
+
+    assert rollups.empty
+    assert list(rollups.columns) == ["tag", "bucket", "sessions_created", "joins", "leaves"]